@@ -1,33 +1,74 @@
 # backend/app/api/summarize.py
 import os
 import logging
-from typing import Optional
+import threading
+from functools import cache
+from io import BytesIO, StringIO
+from typing import BinaryIO, List, Optional, Union
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import ValidationError
 
-from app.models.schemas import SummarizeRequest, SummarizeResponse
+from app.models.schemas import ALLOWED_STYLES, SummarizeResponse, max_tokens_adapter
 from app.services.llm_client import summarize_text, LLMError
+from app.services import pdf_pool
 
-# File parsing libraries (import at module level; if missing, raise helpful error when used)
-try:
-    import PyPDF2
-except Exception:
-    PyPDF2 = None
+# File parsing libraries are imported on first use so workers start fast;
+# each loader returns None if the library is missing (a helpful error is raised when used).
+@cache
+def _pdfium():
+    try:
+        import pypdfium2  # PDFium bindings; much faster text extraction than PyPDF2
+    except Exception:
+        return None
+    return pypdfium2
 
-try:
-    import docx  # python-docx
-except Exception:
-    docx = None
 
-try:
-    from bs4 import BeautifulSoup
-except Exception:
-    BeautifulSoup = None
+@cache
+def _pypdf2():
+    try:
+        import PyPDF2
+    except Exception:
+        return None
+    return PyPDF2
+
+
+@cache
+def _docx():
+    try:
+        import docx  # python-docx
+    except Exception:
+        return None
+    return docx
+
+
+@cache
+def _beautiful_soup():
+    try:
+        from bs4 import BeautifulSoup
+    except Exception:
+        return None
+    return BeautifulSoup
+
+
+@cache
+def _html_parser() -> str:
+    # Prefer the C-based lxml parser for HTML; fall back to the stdlib parser if it is missing.
+    try:
+        import lxml  # noqa: F401
+    except Exception:
+        return "html.parser"
+    return "lxml"
+
+
+@cache
+def _rtf_to_text():
+    try:
+        from striprtf.striprtf import rtf_to_text
+    except Exception:
+        return None
+    return rtf_to_text
 
-try:
-    from striprtf.striprtf import rtf_to_text
-except Exception:
-    rtf_to_text = None
 
 router = APIRouter()
 logger = logging.getLogger("summarize-router")
@@ -36,110 +77,226 @@ logger.setLevel(os.getenv("API_LOG_LEVEL", "INFO"))
 # Default max upload size: 2 MB (you can override via env MAX_UPLOAD_BYTES)
 MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(2 * 1024 * 1024)))
 
+# PDFium is not thread-safe, so calls into it from the threadpool are serialised
+_PDFIUM_LOCK = threading.Lock()
+
+# PDFs with more pages than this are split across the process pool (see app/services/pdf_pool.py)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+
+# Extractors accept either raw bytes or a seekable binary stream (the spooled upload)
+Payload = Union[bytes, BinaryIO]
+
+
+def _as_stream(data: Payload) -> BinaryIO:
+    if isinstance(data, (bytes, bytearray)):
+        return BytesIO(data)
+    data.seek(0)
+    return data
+
 
-def _extract_text_from_pdf_bytes(data: bytes) -> str:
-    if PyPDF2 is None:
-        raise RuntimeError("PyPDF2 is not installed. Please `pip install PyPDF2` to parse PDF files.")
+def _as_bytes(data: Payload) -> bytes:
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    data.seek(0)
+    return data.read()
+
+
+def _peek(data: Payload, size: int) -> bytes:
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data[:size])
+    data.seek(0)
+    head = data.read(size)
+    data.seek(0)
+    return head
+
+
+def _upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, os.SEEK_END)
+    return file.file.tell()
+
+
+def _extract_text_from_pdf_parallel(data: bytes, num_pages: int) -> str:
+    step = -(-num_pages // pdf_pool.PDF_WORKERS)
+    ranges = [(start, min(start + step, num_pages)) for start in range(0, num_pages, step)]
+    texts: List[str] = [""] * num_pages
     try:
-        reader = PyPDF2.PdfReader(io_bytes := data)
-        # PyPDF2 accepts a stream or bytes? Construct from bytes using PdfReader(io.BytesIO(data))
-    except Exception:
-        # Some PyPDF2 versions want a file-like object
-        pass
+        pool = pdf_pool.get_pool()
+        futures = [(start, end, pool.submit(pdf_pool.page_range_text, data, start, end)) for start, end in ranges]
+        for start, end, fut in futures:
+            texts[start:end] = fut.result()
+    except Exception as e:
+        logger.warning("Parallel PDF extraction failed (%s); retrying in-process.", e)
+        pdf_pool.reset_pool()
+        with _PDFIUM_LOCK:
+            texts = pdf_pool.page_range_text(data, 0, num_pages)
+    return "\n".join(texts).strip()
 
-    # Use BytesIO approach for broad compatibility
-    from io import BytesIO
 
+def _extract_text_from_pdf_pypdf2(data: Payload) -> str:
+    PyPDF2 = _pypdf2()
     try:
-        stream = BytesIO(data)
-        reader = PyPDF2.PdfReader(stream)
-        texts = []
+        # PdfReader reads straight from the (spooled) stream; no intermediate bytes copy
+        reader = PyPDF2.PdfReader(_as_stream(data))
+        # Write pages straight into one buffer rather than collecting a list and joining it
+        buf = StringIO()
         for p in reader.pages:
             try:
-                texts.append(p.extract_text() or "")
+                buf.write(p.extract_text() or "")
             except Exception:
                 continue
-        return "\n".join(texts).strip()
+            buf.write("\n")
+        return buf.getvalue().strip()
     except Exception as e:
         raise RuntimeError(f"Failed to parse PDF: {e}")
 
 
-def _extract_text_from_docx_bytes(data: bytes) -> str:
+def _extract_text_from_pdf_pdfium(data: Payload) -> str:
+    with _PDFIUM_LOCK:
+        try:
+            pdf = _pdfium().PdfDocument(_as_stream(data))
+        except Exception as e:
+            if _pypdf2() is None:
+                raise RuntimeError(f"Failed to parse PDF: {e}")
+            # PDFium rejected the file; PyPDF2 is more lenient with some malformed PDFs
+            logger.info("PDFium could not open PDF (%s); retrying with PyPDF2.", e)
+            pdf = None
+        if pdf is not None:
+            try:
+                num_pages = len(pdf)
+                if num_pages <= PDF_PARALLEL_MIN_PAGES or not pdf_pool.enabled():
+                    return "\n".join(pdf_pool.page_text(pdf, i) for i in range(num_pages)).strip()
+            finally:
+                pdf.close()
+    if pdf is None:
+        return _extract_text_from_pdf_pypdf2(data)
+    return _extract_text_from_pdf_parallel(_as_bytes(data), num_pages)
+
+
+def _extract_text_from_pdf_bytes(data: Payload) -> str:
+    if _pdfium() is not None:
+        return _extract_text_from_pdf_pdfium(data)
+    if _pypdf2() is None:
+        raise RuntimeError("pypdfium2 is not installed. Please `pip install pypdfium2` (or PyPDF2) to parse PDF files.")
+    return _extract_text_from_pdf_pypdf2(data)
+
+
+def _extract_text_from_docx_bytes(data: Payload) -> str:
+    docx = _docx()
     if docx is None:
         raise RuntimeError("python-docx is not installed. Please `pip install python-docx` to parse .docx files.")
-    from io import BytesIO
     try:
-        doc = docx.Document(BytesIO(data))
+        doc = docx.Document(_as_stream(data))
         paragraphs = [p.text for p in doc.paragraphs if p.text]
         return "\n".join(paragraphs).strip()
     except Exception as e:
         raise RuntimeError(f"Failed to parse DOCX: {e}")
 
 
-def _extract_text_from_html_bytes(data: bytes) -> str:
+def _extract_text_from_html_bytes(data: Payload) -> str:
+    BeautifulSoup = _beautiful_soup()
     if BeautifulSoup is None:
         raise RuntimeError("beautifulsoup4 is not installed. Please `pip install beautifulsoup4` to parse HTML files.")
     try:
-        text = data.decode("utf-8", errors="ignore")
-        soup = BeautifulSoup(text, "html.parser")
+        # Pass raw bytes so bs4 sniffs the encoding (cchardet when installed) instead of forcing utf-8.
+        soup = BeautifulSoup(_as_bytes(data), _html_parser())
         return soup.get_text(separator="\n").strip()
     except Exception as e:
         raise RuntimeError(f"Failed to parse HTML: {e}")
 
 
-def _extract_text_from_rtf_bytes(data: bytes) -> str:
+def _extract_text_from_rtf_bytes(data: Payload) -> str:
+    rtf_to_text = _rtf_to_text()
     if rtf_to_text is None:
         raise RuntimeError("striprtf is not installed. Please `pip install striprtf` to parse RTF files.")
     try:
-        text = data.decode("utf-8", errors="ignore")
+        text = _as_bytes(data).decode("utf-8", errors="ignore")
         return rtf_to_text(text).strip()
     except Exception as e:
         raise RuntimeError(f"Failed to parse RTF: {e}")
 
 
-def _extract_text_from_bytes_guess(data: bytes, filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+def _extract_text_from_plain_bytes(data: Payload) -> str:
+    # Strip the bytes before decoding so only one str copy of the payload is made
+    data = _as_bytes(data).strip()
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1", errors="ignore")
+
+
+# Leading magic bytes -> extractor; checked before any filename / content-type hints
+_MAGIC = (
+    (b"%PDF", _extract_text_from_pdf_bytes),
+    (b"PK\x03\x04", _extract_text_from_docx_bytes),  # zip container (.docx)
+    (b"{\\rtf", _extract_text_from_rtf_bytes),
+)
+_HTML_MAGIC = (b"<!doctype html", b"<html")
+
+_EXT_EXTRACTORS = {
+    "pdf": _extract_text_from_pdf_bytes,
+    "docx": _extract_text_from_docx_bytes,
+    # note: .doc (binary) not supported by python-docx; will likely fail
+    "doc": _extract_text_from_docx_bytes,
+    "html": _extract_text_from_html_bytes,
+    "htm": _extract_text_from_html_bytes,
+    "rtf": _extract_text_from_rtf_bytes,
+    "txt": _extract_text_from_plain_bytes,
+    "md": _extract_text_from_plain_bytes,
+    "markdown": _extract_text_from_plain_bytes,
+}
+
+_CONTENT_TYPE_EXTRACTORS = {
+    "application/pdf": _extract_text_from_pdf_bytes,
+    "application/x-pdf": _extract_text_from_pdf_bytes,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": _extract_text_from_docx_bytes,
+    "application/msword": _extract_text_from_docx_bytes,
+    "text/html": _extract_text_from_html_bytes,
+    "application/xhtml+xml": _extract_text_from_html_bytes,
+    "application/rtf": _extract_text_from_rtf_bytes,
+    "text/rtf": _extract_text_from_rtf_bytes,
+}
+
+
+def _extract_text_from_bytes_guess(data: Payload, filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
     """
-    Try to extract text from uploaded bytes by checking extension, content-type, and falling back to utf-8 decode.
+    Try to extract text from uploaded bytes by checking magic bytes, then extension and content-type,
+    and falling back to utf-8 decode.
     """
+    head = _peek(data, 64)
+    for magic, extractor in _MAGIC:
+        if head.startswith(magic):
+            return extractor(data)
+    if head.lstrip(b"\xef\xbb\xbf \t\r\n").lower().startswith(_HTML_MAGIC):
+        return _extract_text_from_html_bytes(data)
+
     # check filename extension
-    ext = (filename or "").lower().split(".")[-1] if filename and "." in filename else ""
+    ext = filename.rpartition(".")[2].lower() if filename and "." in filename else ""
+    extractor = _EXT_EXTRACTORS.get(ext)
+    if extractor is not None:
+        return extractor(data)
 
     # Use content-type when available for hint (e.g., application/pdf)
-    ct = (content_type or "").lower()
-
-    # PDF detection
-    if ext == "pdf" or "pdf" in ct:
-        return _extract_text_from_pdf_bytes(data)
-
-    # DOCX
-    if ext in ("docx", "doc") or "word" in ct:
-        # note: .doc (binary) not supported by python-docx; will likely fail
-        return _extract_text_from_docx_bytes(data)
-
-    # HTML
-    if ext in ("html", "htm") or "html" in ct:
-        return _extract_text_from_html_bytes(data)
-
-    # RTF
-    if ext == "rtf" or "rtf" in ct:
-        return _extract_text_from_rtf_bytes(data)
+    ct = (content_type or "").split(";", 1)[0].strip().lower()
+    extractor = _CONTENT_TYPE_EXTRACTORS.get(ct)
+    if extractor is not None:
+        return extractor(data)
+    if ct.startswith("text/"):
+        return _extract_text_from_plain_bytes(data)
 
-    # Plain text / markdown
-    if ext in ("txt", "md", "markdown") or ct.startswith("text/"):
-        try:
-            return data.decode("utf-8").strip()
-        except Exception:
-            return data.decode("latin-1", errors="ignore").strip()
+    # As last resort try UTF-8 decode (errors="ignore" never raises)
+    return _as_bytes(data).strip().decode("utf-8", errors="ignore")
 
-    # Heuristic: try PDF magic bytes
-    if len(data) > 4 and data[:4] == b"%PDF":
-        return _extract_text_from_pdf_bytes(data)
 
-    # As last resort try UTF-8 decode
+def _validate_max_tokens(value) -> Optional[int]:
+    """
+    Validate max_tokens against the shared schema rule (positive integer; booleans and fractions rejected).
+    """
     try:
-        return data.decode("utf-8", errors="ignore").strip()
-    except Exception:
-        return data.decode("latin-1", errors="ignore").strip()
+        return max_tokens_adapter.validate_python(value)
+    except ValidationError:
+        raise HTTPException(status_code=422, detail="max_tokens must be a positive integer")
 
 
 @router.post("/summarize", response_model=SummarizeResponse)
@@ -169,15 +326,18 @@ async def summarize_endpoint(
     # If file uploaded and text not given, try to extract text from file
     if file and (parsed_text is None or parsed_text.strip() == ""):
         filename = file.filename or "uploaded"
-        # Read bytes (enforce size)
-        contents = await file.read()
-        if len(contents) > MAX_UPLOAD_BYTES:
+        # Starlette has already spooled the upload into file.file; reject oversized ones before parsing
+        if _upload_size(file) > MAX_UPLOAD_BYTES:
             raise HTTPException(status_code=413, detail=f"Uploaded file is too large. Max {MAX_UPLOAD_BYTES} bytes allowed.")
+        contents = file.file
+        contents.seek(0)
         # Determine content-type header from UploadFile if possible
         ctype = getattr(file, "content_type", None)
-        # Try to extract
+        # Try to extract (parsers are synchronous and CPU-bound, so keep them off the event loop)
         try:
-            parsed_text = _extract_text_from_bytes_guess(contents, filename=filename, content_type=ctype)
+            parsed_text = await run_in_threadpool(
+                _extract_text_from_bytes_guess, contents, filename=filename, content_type=ctype
+            )
         except RuntimeError as e:
             # parsing failed for that file type
             raise HTTPException(status_code=400, detail=str(e))
@@ -187,19 +347,16 @@ async def summarize_endpoint(
         raise HTTPException(status_code=400, detail="No text provided. Provide 'text' or upload a file with readable text.")
 
     # Validate style
-    if style not in ("brief", "detailed", "bullets"):
+    if style not in ALLOWED_STYLES:
         raise HTTPException(status_code=400, detail=f"Invalid style '{style}'. Allowed: brief | detailed | bullets")
 
-    # Validate request model (Pydantic)
-    try:
-        req = SummarizeRequest(text=parsed_text, style=style, max_tokens=max_tokens)
-    except ValidationError as e:
-        raise HTTPException(status_code=422, detail=str(e))
+    # Validate max_tokens (JSON bodies are not coerced by Form)
+    max_tokens = _validate_max_tokens(max_tokens)
 
     # Call LLM client
     try:
-        summary = summarize_text(req.text, req.style, req.max_tokens)
-        return SummarizeResponse(summary=summary, style=req.style)
+        summary = await summarize_text(parsed_text.strip(), style, max_tokens)
+        return SummarizeResponse(summary=summary, style=style)
     except LLMError as e:
         logger.warning("LLM error: %s", e)
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
@@ -1,11 +1,13 @@
 # backend/app/main.py
 import os
 import logging
+from contextlib import asynccontextmanager
 from typing import List
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import uvicorn
@@ -26,16 +28,29 @@ except Exception as e:
     logger.exception("Failed to import summarize router. Ensure app/api/summarize.py exists.")
     raise
 
+from app.services.llm_client import close_clients as close_llm_clients
+from app.services import pdf_pool
+
 # Config
 BACKEND_HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
 BACKEND_PORT = int(os.getenv("BACKEND_PORT", "8000"))
 _allowed = os.getenv("FRONTEND_ALLOW_ORIGINS", "http://localhost:5173")
 ALLOWED_ORIGINS: List[str] = [o.strip() for o in _allowed.split(",") if o.strip()]
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "512"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_llm_clients()
+    pdf_pool.shutdown_pool()
 
 app = FastAPI(
     title="Document Summarization Service",
     version="0.1.0",
-    description="Simple service that accepts text or .txt file and returns an LLM-generated summary."
+    description="Simple service that accepts text or .txt file and returns an LLM-generated summary.",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS middleware so frontend can call us
@@ -47,6 +62,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger (e.g. detailed) summaries for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+
 @app.get("/", summary="Service status")
 async def root():
     return {"status": "ok", "service": "document-summarizer", "version": app.version}
@@ -58,12 +76,12 @@ app.include_router(summarize_router, prefix="/api")
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     logger.warning("HTTP exception: %s %s -> %s", request.method, request.url, exc.detail)
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return ORJSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.warning("Validation error: %s %s -> %s", request.method, request.url, exc.errors())
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={"detail": "Request validation failed", "errors": exc.errors()},
     )
@@ -71,7 +89,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     logger.exception("Unhandled exception for request %s %s", request.method, request.url)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error. Please try again later."},
     )
@@ -1,33 +1,25 @@
 # backend/app/models/schemas.py
-from typing import Optional, Literal
-from pydantic import BaseModel, Field, validator
+from typing import Annotated, Optional, Literal, get_args
+from pydantic import BaseModel, BeforeValidator, ConfigDict, PositiveInt, TypeAdapter
 
-ALLOWED_STYLES = ("brief", "detailed", "bullets")
+# Request field rules; summarize_endpoint validates its form/JSON inputs against these.
+Style = Literal["brief", "detailed", "bullets"]
+ALLOWED_STYLES = get_args(Style)
 
-class SummarizeRequest(BaseModel):
-    text: Optional[str] = Field(None, description="Text to summarize (if not uploading a file).")
-    style: Optional[Literal["brief", "detailed", "bullets"]] = Field(
-        "brief", description="Summarization style: brief | detailed | bullets"
-    )
-    max_tokens: Optional[int] = Field(
-        None, description="Optional max tokens limit for the LLM response."
-    )
 
-    @validator("text")
-    def text_not_empty(cls, v):
-        if v is not None:
-            trimmed = v.strip()
-            if trimmed == "":
-                raise ValueError("text must not be empty")
-            return trimmed
-        return v
+def _reject_bool(v):
+    # pydantic's lax mode would coerce True -> 1
+    if isinstance(v, bool):
+        raise ValueError("max_tokens must be a positive integer")
+    return v
 
-    @validator("max_tokens")
-    def max_tokens_positive(cls, v):
-        if v is not None and v <= 0:
-            raise ValueError("max_tokens must be a positive integer")
-        return v
+
+# Optional max tokens limit for the LLM response (integral floats / numeric strings are accepted).
+MaxTokens = Optional[Annotated[PositiveInt, BeforeValidator(_reject_bool)]]
+max_tokens_adapter: TypeAdapter = TypeAdapter(MaxTokens)
 
 class SummarizeResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     summary: str
-    style: Literal["brief", "detailed", "bullets"]
+    style: Style
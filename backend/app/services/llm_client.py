@@ -1,20 +1,35 @@
 # backend/app/services/llm_client.py
 import os
+import asyncio
+import hashlib
 import logging
 import re
 import time
-from typing import Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+from cachetools import TTLCache
+
+# Non-cryptographic hash for cache keys; fall back to BLAKE2b if xxhash is missing.
+try:
+    import xxhash
+except Exception:
+    xxhash = None
 
 # Attempt to import providers' SDKs; allow them to be missing.
+try:
+    import httpx
+except Exception:
+    httpx = None
+
 try:
     import openai
 except Exception:
     openai = None
 
 try:
-    from groq import Groq
+    from groq import AsyncGroq
 except Exception:
-    Groq = None
+    AsyncGroq = None
 
 # Load .env if present
 from dotenv import load_dotenv
@@ -37,27 +52,103 @@ GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT_SEC", "10.0"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+# Timeout for openai requests in seconds (the SDK default is 10 minutes)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT_SEC", "30.0"))
 DEFAULT_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+# Keep-alive connections held open per provider so calls reuse TLS sessions
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "32"))
+# In-process cache of provider summaries keyed by (content hash, style, max_tokens)
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL_SEC", "3600"))
+# After a rate/quota/timeout error a provider is skipped (straight to stub) for this many seconds
+PROVIDER_COOLDOWN = float(os.getenv("PROVIDER_COOLDOWN_SEC", "60"))
 
 # Determine provider order
 TRY_GROQ_FIRST = USE_GROQ_ENV or bool(GROQ_API_KEY)
 
 # Exceptions placeholders
+class _UnavailableError(Exception):
+    """Stand-in for an SDK exception class that doesn't exist in the installed version (never raised)."""
+
+
+# Rate-limit/timeout placeholders must never match other errors: they open the circuit breaker.
 OpenAIError = Exception
-OpenAIRateLimitError = Exception
+OpenAIRateLimitError = _UnavailableError
+OpenAITimeoutError = _UnavailableError
 try:
     from openai.error import OpenAIError as _OpenAIError, RateLimitError as _OpenAIRateLimitError  # type: ignore
     OpenAIError = _OpenAIError
     OpenAIRateLimitError = _OpenAIRateLimitError
+    try:
+        from openai.error import Timeout as _OpenAITimeoutError  # type: ignore
+        OpenAITimeoutError = _OpenAITimeoutError
+    except Exception:
+        pass
 except Exception:
     if openai is not None:
         OpenAIError = getattr(openai, "OpenAIError", Exception)
-        OpenAIRateLimitError = getattr(openai, "RateLimitError", Exception)
+        OpenAIRateLimitError = getattr(openai, "RateLimitError", _UnavailableError)
+        OpenAITimeoutError = getattr(openai, "APITimeoutError", _UnavailableError)
 
 # Groq exception placeholders (SDK varies). We'll inspect messages.
 class GroqRateLimitError(Exception):
     pass
 
+
+# ---------------------------
+# Shared async clients (created once at import, reused across requests)
+# ---------------------------
+def _make_http_client():
+    if httpx is None:
+        return None
+    return httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=LLM_MAX_KEEPALIVE))
+
+
+def _init_groq_client():
+    if AsyncGroq is None or not GROQ_API_KEY:
+        return None
+    kwargs = {"api_key": GROQ_API_KEY, "timeout": GROQ_TIMEOUT}
+    http_client = _make_http_client()
+    if http_client is not None:
+        kwargs["http_client"] = http_client
+    try:
+        return AsyncGroq(**kwargs)
+    except Exception as e:
+        logger.error("Failed to instantiate Groq client: %s", e)
+        return None
+
+
+def _init_openai_client():
+    AsyncOpenAI = getattr(openai, "AsyncOpenAI", None) if openai is not None else None
+    if AsyncOpenAI is None or not OPENAI_API_KEY:
+        return None
+    kwargs = {"api_key": OPENAI_API_KEY, "timeout": OPENAI_TIMEOUT}
+    if OPENAI_API_BASE:
+        kwargs["base_url"] = OPENAI_API_BASE
+    http_client = _make_http_client()
+    if http_client is not None:
+        kwargs["http_client"] = http_client
+    try:
+        return AsyncOpenAI(**kwargs)
+    except Exception as e:
+        logger.error("Failed to instantiate OpenAI client: %s", e)
+        return None
+
+
+_groq_async = _init_groq_client()
+_openai_async = _init_openai_client()
+
+
+async def close_clients() -> None:
+    """Close the pooled provider connections (call on application shutdown)."""
+    for client in (_groq_async, _openai_async):
+        if client is None:
+            continue
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning("Failed to close LLM client cleanly: %s", e)
+
 # Prompt templates
 _PROMPTS = {
     "brief": "Summarize the following text in 2-4 concise sentences, focusing on main points and outcomes.",
@@ -67,22 +158,67 @@ _PROMPTS = {
     ),
     "bullets": "Summarize the following text as concise bullet points. Each bullet should be short and focus on one idea."
 }
+# Per-style system messages, built once. The constant instructions form an identical prefix on every
+# call (eligible for provider-side prompt caching); the user turn carries only the text.
+_SYSTEM = {
+    k: f"You are a helpful summarization assistant. {v} The user message is the text to summarize."
+    for k, v in _PROMPTS.items()
+}
+
+# Sentence boundary used by the local stub
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
 
 
 class LLMError(RuntimeError):
     """Generic wrapper for LLM-related errors."""
 
 
-def build_prompt(style: str, text: str) -> str:
-    header = _PROMPTS.get(style, _PROMPTS["brief"])
-    return f"{header}\n\nText to summarize:\n\"\"\"\n{text}\n\"\"\"\n\nSummary:"
+_summary_cache: TTLCache = TTLCache(maxsize=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL)
+
+
+# Circuit breaker: provider -> time.monotonic() until which it is considered down
+_breaker = {"groq": 0.0, "openai": 0.0}
+
+
+def _trip_breaker(provider: str) -> None:
+    if PROVIDER_COOLDOWN > 0:
+        _breaker[provider] = time.monotonic() + PROVIDER_COOLDOWN
+
+
+CacheKey = Tuple[Union[int, bytes], str, Optional[int]]
+
+
+def _cache_key(text: str, style: str, max_tokens: Optional[int]) -> CacheKey:
+    data = text.encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh3_128_intdigest(data), style, max_tokens
+    return hashlib.blake2b(data, digest_size=16).digest(), style, max_tokens
+
+
+# Provider calls currently running, so identical concurrent requests share one LLM round-trip
+_inflight: Dict[CacheKey, "asyncio.Task"] = {}
+
+
+def _forget_inflight(key: CacheKey, task: "asyncio.Task") -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        # mark the exception retrieved; every awaiting caller re-raises it itself
+        task.exception()
+
+
+def build_messages(style: str, text: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": _SYSTEM.get(style, _SYSTEM["brief"])},
+        {"role": "user", "content": text},
+    ]
 
 
 # ---------------------------
 # Local dev stub
 # ---------------------------
 def _stub_summary(text: str, style: str) -> str:
-    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+    sentences = [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
     if not sentences:
         return "[STUB] (no usable sentences found in text)"
 
@@ -114,65 +250,27 @@ def _stub_summary(text: str, style: str) -> str:
 # ---------------------------
 # Groq caller (with timeout handling)
 # ---------------------------
-def _call_groq(prompt: str, max_tokens: Optional[int]) -> str:
+async def _call_groq(style: str, text: str, max_tokens: Optional[int]) -> str:
     """
-    Call Groq with a timeout. The Groq SDK has varied signatures across versions,
-    so we attempt several ways to pass a timeout. If Groq raises network/timeout/quota errors,
-    we surface them in a way the caller can detect and fallback.
+    Call Groq through the shared async client. The request timeout is configured on the client;
+    if Groq raises network/timeout/quota errors, we surface them in a way the caller can detect and fallback.
     """
-    if Groq is None:
+    if AsyncGroq is None:
         raise LLMError("Groq SDK is not installed. Please `pip install groq` to use Groq provider.")
+    if _groq_async is None:
+        raise LLMError("Failed to instantiate Groq client.")
 
     logger.info("Attempting Groq call (model=%s, timeout=%ss)", GROQ_MODEL, GROQ_TIMEOUT)
 
-    # Instantiate client while trying common timeout param names.
-    client = None
-    inst_errors = []
-    try_kwargs = [
-        {"api_key": GROQ_API_KEY, "timeout": GROQ_TIMEOUT},
-        {"api_key": GROQ_API_KEY, "request_timeout": GROQ_TIMEOUT},
-        {"api_key": GROQ_API_KEY},
-        {},
-    ]
-    for kw in try_kwargs:
-        try:
-            # Only pass api_key if value present to avoid passing None
-            kw_clean = {k: v for k, v in kw.items() if v is not None}
-            client = Groq(**kw_clean) if kw_clean else Groq()
-            logger.debug("Groq client instantiated with kwargs: %s", kw_clean)
-            break
-        except TypeError as te:
-            inst_errors.append(("TypeError", str(te)))
-            continue
-        except Exception as e:
-            inst_errors.append(("Exception", str(e)))
-            continue
-
-    if client is None:
-        logger.error("Failed to instantiate Groq client. Attempts: %s", inst_errors)
-        raise LLMError("Failed to instantiate Groq client.")
-
-    # Prepare messages and call. We'll implement our own timeout guard via time checks
-    messages = [
-        {"role": "system", "content": "You are a helpful summarization assistant."},
-        {"role": "user", "content": prompt},
-    ]
-    # Some Groq client versions accept a timeout param on the method call; try that first.
-    call_attempts = []
+    messages = build_messages(style, text)
     start = time.time()
     try:
-        try:
-            resp = client.chat.completions.create(messages=messages, model=os.getenv("GROQ_MODEL", GROQ_MODEL), timeout=GROQ_TIMEOUT)
-            call_attempts.append("create(timeout)")
-        except TypeError:
-            # method may not accept timeout kw; try without and rely on client-level timeout
-            resp = client.chat.completions.create(messages=messages, model=os.getenv("GROQ_MODEL", GROQ_MODEL))
-            call_attempts.append("create()")
+        resp = await _groq_async.chat.completions.create(messages=messages, model=GROQ_MODEL, timeout=GROQ_TIMEOUT)
     except Exception as e:
         # inspect message for quota/rate/timeout hints
         elapsed = time.time() - start
         msg = str(e).lower()
-        logger.exception("Groq call failed after %.2fs. attempts=%s error=%s", elapsed, call_attempts, e)
+        logger.exception("Groq call failed after %.2fs. error=%s", elapsed, e)
         if "quota" in msg or "rate" in msg or "429" in msg or "timeout" in msg or "timed out" in msg:
             # treat as rate/timeout so caller may fallback
             raise GroqRateLimitError(e)
@@ -191,37 +289,23 @@ def _call_groq(prompt: str, max_tokens: Optional[int]) -> str:
 # ---------------------------
 # OpenAI callers (v2 and v1)
 # ---------------------------
-def _call_openai_v2(prompt: str, max_tokens: Optional[int]) -> str:
+async def _call_openai_v2(style: str, text: str, max_tokens: Optional[int]) -> str:
     if openai is None:
         raise LLMError("OpenAI SDK is not installed (v2 path).")
 
-    OpenAI = getattr(openai, "OpenAI", None)
-    if OpenAI is None:
+    if getattr(openai, "AsyncOpenAI", None) is None:
         raise LLMError("OpenAI v2 client class not present in installed SDK.")
 
-    # Provide credentials via environment for compatibility
-    if OPENAI_API_KEY:
-        os.environ.setdefault("OPENAI_API_KEY", OPENAI_API_KEY)
-    if OPENAI_API_BASE:
-        os.environ.setdefault("OPENAI_API_BASE", OPENAI_API_BASE)
-        os.environ.setdefault("OPENAI_API_BASE_URL", OPENAI_API_BASE)
-
-    try:
-        client = OpenAI()
-    except Exception as e:
-        logger.exception("Failed to instantiate OpenAI client: %s", e)
-        raise LLMError(f"Failed to instantiate OpenAI client: {e}")
+    if _openai_async is None:
+        raise LLMError("Failed to instantiate OpenAI client. Is OPENAI_API_KEY set?")
 
-    messages = [
-        {"role": "system", "content": "You are a helpful summarization assistant."},
-        {"role": "user", "content": prompt},
-    ]
+    messages = build_messages(style, text)
     create_args = {"model": OPENAI_MODEL, "messages": messages, "temperature": float(DEFAULT_TEMPERATURE)}
     if max_tokens:
         create_args["max_tokens"] = int(max_tokens)
 
     try:
-        resp = client.chat.completions.create(**create_args)
+        resp = await _openai_async.chat.completions.create(**create_args)
         choices = getattr(resp, "choices", None) or resp.get("choices", [])
         if not choices:
             raise LLMError("LLM returned no choices (openai v2).")
@@ -229,8 +313,9 @@ def _call_openai_v2(prompt: str, max_tokens: Optional[int]) -> str:
         message = getattr(first, "message", None) or first.get("message", {})
         content = getattr(message, "content", None) or message.get("content", "") or first.get("text", "")
         return content.strip()
-    except OpenAIRateLimitError as e:
-        logger.warning("OpenAI v2 rate/quotas: %s", e)
+    except (OpenAIRateLimitError, OpenAITimeoutError) as e:
+        # re-raise before the OpenAIError clause so the caller can trip the circuit breaker
+        logger.warning("OpenAI v2 rate/quotas/timeout: %s", e)
         raise
     except OpenAIError as e:
         logger.exception("OpenAI v2 API error: %s", e)
@@ -240,7 +325,7 @@ def _call_openai_v2(prompt: str, max_tokens: Optional[int]) -> str:
         raise LLMError(f"OpenAI v2 unexpected error: {e}")
 
 
-def _call_openai_v1(prompt: str, max_tokens: Optional[int]) -> str:
+async def _call_openai_v1(style: str, text: str, max_tokens: Optional[int]) -> str:
     if openai is None:
         raise LLMError("OpenAI SDK is not installed (v1 path).")
 
@@ -257,17 +342,14 @@ def _call_openai_v1(prompt: str, max_tokens: Optional[int]) -> str:
 
     params = {
         "model": OPENAI_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful summarization assistant."},
-            {"role": "user", "content": prompt},
-        ],
+        "messages": build_messages(style, text),
         "temperature": DEFAULT_TEMPERATURE,
     }
     if max_tokens:
         params["max_tokens"] = int(max_tokens)
 
     try:
-        resp = openai.ChatCompletion.create(**params)  # type: ignore
+        resp = await openai.ChatCompletion.acreate(**params)  # type: ignore
         choices = resp.get("choices", [])
         if not choices:
             raise LLMError("LLM returned no choices (openai v1).")
@@ -275,8 +357,8 @@ def _call_openai_v1(prompt: str, max_tokens: Optional[int]) -> str:
         message = first.get("message") or {}
         content = message.get("content") or first.get("text") or ""
         return content.strip()
-    except OpenAIRateLimitError as e:
-        logger.warning("OpenAI v1 rate/quotas: %s", e)
+    except (OpenAIRateLimitError, OpenAITimeoutError) as e:
+        logger.warning("OpenAI v1 rate/quotas/timeout: %s", e)
         raise
     except OpenAIError as e:
         logger.exception("OpenAI v1 API error: %s", e)
@@ -287,33 +369,24 @@ def _call_openai_v1(prompt: str, max_tokens: Optional[int]) -> str:
 
 
 # ---------------------------
-# Public summarization function with provider selection and fallback logic
+# Provider selection and fallback logic
 # ---------------------------
-def summarize_text(text: str, style: str = "brief", max_tokens: Optional[int] = None) -> str:
+async def _summarize_with_providers(text: str, style: str, max_tokens: Optional[int]) -> Optional[str]:
     """
-    Summarize text with provider selection:
-      - If USE_STUB is true -> return local stub
-      - If TRY_GROQ_FIRST -> attempt Groq (with timeout), then OpenAI v2/v1, then stub on quota/errors
-      - Else -> attempt OpenAI (v2 then v1), then Groq if configured, then stub
+    Try the configured providers in order. Returns None when the caller should fall back to the stub
+    (rate/quota/timeout errors or no provider available), so that fallbacks are never cached.
     """
-    # Stub override
-    use_stub = USE_STUB_ENV or (os.getenv("USE_STUB", "false").lower() in ("1", "true", "yes"))
-    if use_stub:
-        logger.info("USE_STUB is enabled — returning local stub summary (no LLM call).")
-        return _stub_summary(text, style)
-
-    if style not in _PROMPTS:
-        raise ValueError("Unsupported style")
-
-    prompt = build_prompt(style, text)
-
-    # Helper to try provider and fall back to stub on rate/quota or timeout errors
-    def try_provider(fn, provider_name: str):
+    # Helper to try provider and signal stub fallback on rate/quota or timeout errors
+    async def try_provider(fn, provider_name: str, breaker_key: str):
+        if time.monotonic() < _breaker[breaker_key]:
+            logger.warning("%s circuit open after recent rate/quota/timeout error — falling back to stub.", provider_name)
+            return None
         try:
-            return fn(prompt, max_tokens)
-        except (GroqRateLimitError, OpenAIRateLimitError) as e:
-            logger.warning("%s reported rate/quota error: %s — falling back to stub.", provider_name, e)
-            return _stub_summary(text, style)
+            return await fn(style, text, max_tokens)
+        except (GroqRateLimitError, OpenAIRateLimitError, OpenAITimeoutError) as e:
+            logger.warning("%s reported rate/quota/timeout error: %s — falling back to stub.", provider_name, e)
+            _trip_breaker(breaker_key)
+            return None
         except LLMError:
             # propagate provider-side application errors
             raise
@@ -322,7 +395,8 @@ def summarize_text(text: str, style: str = "brief", max_tokens: Optional[int] =
             msg = str(e).lower()
             if "timeout" in msg or "timed out" in msg or "quota" in msg or "rate" in msg or "429" in msg:
                 logger.warning("%s error suggests timeout/quota: %s — falling back to stub.", provider_name, e)
-                return _stub_summary(text, style)
+                _trip_breaker(breaker_key)
+                return None
             logger.exception("%s unexpected error: %s", provider_name, e)
             # wrap as LLMError
             raise LLMError(f"{provider_name} unexpected error: {e}")
@@ -334,7 +408,7 @@ def summarize_text(text: str, style: str = "brief", max_tokens: Optional[int] =
         providers_tried.append("groq")
         try:
             logger.info("Trying Groq as primary provider.")
-            return try_provider(_call_groq, "Groq")
+            return await try_provider(_call_groq, "Groq", "groq")
         except LLMError:
             raise
         except Exception:
@@ -344,9 +418,9 @@ def summarize_text(text: str, style: str = "brief", max_tokens: Optional[int] =
     if openai is not None:
         providers_tried.append("openai_v2")
         try:
-            if hasattr(openai, "OpenAI"):
+            if hasattr(openai, "AsyncOpenAI"):
                 logger.info("Trying OpenAI v2.")
-                return try_provider(_call_openai_v2, "OpenAI v2")
+                return await try_provider(_call_openai_v2, "OpenAI v2", "openai")
         except LLMError:
             raise
         except Exception:
@@ -354,21 +428,64 @@ def summarize_text(text: str, style: str = "brief", max_tokens: Optional[int] =
 
         try:
             logger.info("Trying OpenAI v1.")
-            return try_provider(_call_openai_v1, "OpenAI v1")
+            return await try_provider(_call_openai_v1, "OpenAI v1", "openai")
         except LLMError:
             raise
         except Exception:
             logger.exception("OpenAI v1 failed; will try Groq if configured.")
 
     # If not tried Groq yet and Groq is configured, try Groq now
-    if not TRY_GROQ_FIRST and (Groq is not None or GROQ_API_KEY):
+    if not TRY_GROQ_FIRST and (AsyncGroq is not None or GROQ_API_KEY):
         try:
             logger.info("Trying Groq as secondary provider.")
-            return try_provider(_call_groq, "Groq")
+            return await try_provider(_call_groq, "Groq", "groq")
         except LLMError:
             raise
         except Exception:
             logger.exception("Groq attempt failed; falling back to stub.")
 
     logger.warning("No provider succeeded (tried: %s). Returning stub summary.", providers_tried)
-    return _stub_summary(text, style)
+    return None
+
+
+# ---------------------------
+# Public summarization function
+# ---------------------------
+async def summarize_text(text: str, style: str = "brief", max_tokens: Optional[int] = None) -> str:
+    """
+    Summarize text with provider selection:
+      - If USE_STUB is true -> return local stub
+      - If the same (text, style, max_tokens) was summarized recently -> return the cached summary
+      - If an identical request is already in flight -> wait for its result instead of calling again
+      - If TRY_GROQ_FIRST -> attempt Groq (with timeout), then OpenAI v2/v1, then stub on quota/errors
+      - Else -> attempt OpenAI (v2 then v1), then Groq if configured, then stub
+    """
+    # Stub override
+    use_stub = USE_STUB_ENV or (os.getenv("USE_STUB", "false").lower() in ("1", "true", "yes"))
+    if use_stub:
+        logger.info("USE_STUB is enabled — returning local stub summary (no LLM call).")
+        return _stub_summary(text, style)
+
+    if style not in _PROMPTS:
+        raise ValueError("Unsupported style")
+
+    key = _cache_key(text, style, max_tokens)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        logger.info("Summary cache hit (style=%s).", style)
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_summarize_with_providers(text, style, max_tokens))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget_inflight(key, t))
+    else:
+        logger.info("Joining in-flight summarization (style=%s).", style)
+
+    # shield: a disconnecting caller must not cancel the call other callers are waiting on
+    summary = await asyncio.shield(task)
+    if summary is None:
+        return _stub_summary(text, style)
+    _summary_cache[key] = summary
+    return summary
@@ -0,0 +1,82 @@
+# backend/app/services/pdf_pool.py
+# Process pool for extracting text from large PDFs. This module only depends on the stdlib and
+# pypdfium2 so that spawned workers import it quickly (no FastAPI / SDK clients in the children).
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+
+def _default_workers() -> int:
+    # CPUs this process may run on (respects cgroup/affinity limits, unlike os.cpu_count()), capped
+    # so a big host doesn't translate into dozens of idle interpreters per app worker
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return min(cpus, 4)
+
+
+# The pool is created lazily, the first time a PDF exceeds the page threshold (0 or 1 disables it)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(_default_workers())))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def page_text(pdf, index: int) -> str:
+    page = pdf[index]
+    try:
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range() or ""
+        finally:
+            textpage.close()
+    except Exception:
+        return ""
+    finally:
+        page.close()
+
+
+def page_range_text(data: bytes, start: int, end: int) -> List[str]:
+    """
+    Process-pool worker: reopen the document (PdfDocument objects don't pickle) and extract pages [start, end).
+    """
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        return [page_text(pdf, i) for i in range(start, end)]
+    finally:
+        pdf.close()
+
+
+def enabled() -> bool:
+    return PDF_WORKERS >= 2
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: forking while another thread is inside PDFium is unsafe
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def reset_pool() -> None:
+    """Discard a (possibly broken) pool; the next get_pool() call creates a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None